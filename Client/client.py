@@ -411,10 +411,10 @@ class Client:
             comm = self._comm
             if comm is None:
                 break
-            msg = comm.recv_async(timeout=0.25)
-            if msg is None:
-                continue
-            if comm.is_close_marker(msg):
+            # Blocking get — close() makes the transport emit its close marker,
+            # so no poll timeout is needed to notice shutdown.
+            msg = comm.recv_async()
+            if msg is None or comm.is_close_marker(msg):
                 break
             if not isinstance(msg, dict):
                 continue
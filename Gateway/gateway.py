@@ -3,7 +3,6 @@ __author__ = "Nadav"
 import os
 import sys
 import threading
-import time
 import logging
 import json
 import hashlib
@@ -67,32 +66,41 @@ class GatewayServer:
         self.seen_minted_asset_ids = set()
 
         self.gateway_operations = {
-            "buy_asset": self.tx_request_buy,
-            "sell_asset": self.tx_request_sell,
-            "publish_tx": self.broadcast_tx_to_verify,
-            "tx_request_buy": self.tx_request_buy,
-            "tx_request_sell": self.tx_request_sell,
-            "get_balance": self.handle_get_balance,
-            "create_balance": self.create_balance,
-            "upload_asset": self.handle_upload_asset,
-            "unlist_asset": self.handle_unlist_asset_from_server,
-            "list_asset": self.handle_list_asset_from_server,
+            op: getattr(self, name) for op, name in self._GATEWAY_OPERATION_NAMES.items()
         }
         self.blockchain_operations = {
-            "register_blockchain_node": self.register_blockchain_node,
-            "tx_request_buy": self.tx_request_buy,
-            "tx_request_sell": self.tx_request_sell,
-            "broadcast_tx_to_verify": self.broadcast_tx_to_verify,
-            "get_balance": self.handle_get_balance,
-            "buy_success": self.notify_buy_success,
-            "sell_success": self.notify_sell_success,
-            "send_balance": self.notify_send_balance,
-            "asset_signed_in_blockchain": self.handle_asset_signed_in_blockchain,
-            "asset_unlist_signed_in_blockchain": self.handle_asset_unlist_signed_in_blockchain,
-            "asset_list_signed_in_blockchain": self.handle_asset_list_signed_in_blockchain,
-            "minted_ids": self.handle_minted_ids_response,
+            op: getattr(self, name) for op, name in self._BLOCKCHAIN_OPERATION_NAMES.items()
         }
 
+    # Routing tables live on the class (op → method name) and are bound once
+    # per gateway in __init__ — same layout as the server's _HANDLER_NAMES.
+    _GATEWAY_OPERATION_NAMES = {
+        "buy_asset": "tx_request_buy",
+        "sell_asset": "tx_request_sell",
+        "publish_tx": "broadcast_tx_to_verify",
+        "tx_request_buy": "tx_request_buy",
+        "tx_request_sell": "tx_request_sell",
+        "get_balance": "handle_get_balance",
+        "create_balance": "create_balance",
+        "upload_asset": "handle_upload_asset",
+        "unlist_asset": "handle_unlist_asset_from_server",
+        "list_asset": "handle_list_asset_from_server",
+    }
+    _BLOCKCHAIN_OPERATION_NAMES = {
+        "register_blockchain_node": "register_blockchain_node",
+        "tx_request_buy": "tx_request_buy",
+        "tx_request_sell": "tx_request_sell",
+        "broadcast_tx_to_verify": "broadcast_tx_to_verify",
+        "get_balance": "handle_get_balance",
+        "buy_success": "notify_buy_success",
+        "sell_success": "notify_sell_success",
+        "send_balance": "notify_send_balance",
+        "asset_signed_in_blockchain": "handle_asset_signed_in_blockchain",
+        "asset_unlist_signed_in_blockchain": "handle_asset_unlist_signed_in_blockchain",
+        "asset_list_signed_in_blockchain": "handle_asset_list_signed_in_blockchain",
+        "minted_ids": "handle_minted_ids_response",
+    }
+
     def start(self):
         """Start all gateway services: UDP discovery, server relay, node listener."""
         threading.Thread(target=self.udp_service.run, daemon=True).start()
@@ -100,8 +108,9 @@ class GatewayServer:
         threading.Thread(target=self.node_listener.start, daemon=True).start()
 
         self.log_event("Gateway operational. Routing between nodes and server.")
-        while not self.stop_event.is_set():
-            time.sleep(0.2)
+        # Block until stop() — a sleep-poll loop woke the process five times a
+        # second for nothing; Event.wait() parks the thread in the kernel.
+        self.stop_event.wait()
 
     def _server_connect_loop(self):
         """Connect to the server and retry indefinitely on failure or disconnect.
@@ -119,14 +128,16 @@ class GatewayServer:
                 self.log_event("Server connection closed — reconnecting in 5s")
             except Exception as exc:
                 self.log_event(f"Server connection failed ({exc}) — retrying in 5s")
-            if not self.stop_event.is_set():
-                time.sleep(5)
+            # wait() instead of sleep() so stop() interrupts the retry delay
+            self.stop_event.wait(5)
 
     def stop(self):
         self.stop_event.set()
 
-    def log_event(self, message: str, **_extra):
-        self.logger.info(message)
+    def log_event(self, message: str, *args, **_extra):
+        # %-style args are only rendered for records a handler emits, so hot
+        # routing paths can log lazily instead of building f-strings up front
+        self.logger.info(message, *args)
 
     def normalize_type(self, value) -> str:
         return str(value or "").strip().lower()
@@ -363,7 +374,7 @@ class GatewayServer:
 
         self.route_to_server(request)
         self.log_event(
-            f"Routed node message to server: {request.get('type')}",
+            "Routed node message to server: %s", request.get("type"),
             event_type="route",
             direction="outbound",
         )
@@ -529,7 +540,7 @@ class GatewayServer:
         if not tx_id:
             return False
         if tx_id in self.seen_tx_ids:
-            self.log_event(f"TX_DUPLICATE rejected: {label} tx_id={tx_id[:20]}...", status="warning")
+            self.log_event("TX_DUPLICATE rejected: %s tx_id=%.20s...", label, tx_id, status="warning")
             return True
         self.seen_tx_ids.add(tx_id)
         return False
@@ -671,7 +682,7 @@ class GatewayServer:
             self._require_block(block, "LIST_ASSET")
             self._require_asset_id(asset_id, "LIST_ASSET")
             block_hash = self._verify_and_get_hash(block, "LIST_ASSET")
-            self.log_event(f"[LIST_ASSET] verified asset={asset_id} hash={block_hash[:16]}...")
+            self.log_event("[LIST_ASSET] verified asset=%s hash=%.16s...", asset_id, block_hash)
             self._broadcast_verified_block(block, sender_ip, sender_port)
             self.route_to_server({"type": "FULLY_UPLOAD", "asset_id": asset_id, "block_hash": block_hash})
         except AurexError as e:
@@ -792,7 +803,7 @@ class GatewayServer:
             block_hash = self._verify_and_get_hash(block, "ASSET_MINT")
             self._guard_duplicate_mint(asset_id)
             self.seen_minted_asset_ids.add(asset_id)
-            self.log_event(f"[ASSET_MINT] verified asset={asset_id} hash={block_hash[:16]}...")
+            self.log_event("[ASSET_MINT] verified asset=%s hash=%.16s...", asset_id, block_hash)
             self._broadcast_verified_block(block, sender_ip, sender_port)
             self.route_to_server({"type": "FULLY_UPLOAD", "asset_id": asset_id, "block_hash": block_hash})
         except AurexError as e:
@@ -810,7 +821,7 @@ class GatewayServer:
             self._require_block(block, "UNLIST")
             self._require_asset_id(asset_id, "UNLIST")
             block_hash = self._verify_and_get_hash(block, "UNLIST")
-            self.log_event(f"[UNLIST] verified asset={asset_id} hash={block_hash[:16]}...")
+            self.log_event("[UNLIST] verified asset=%s hash=%.16s...", asset_id, block_hash)
             self._broadcast_verified_block(block, sender_ip, sender_port)
             self.route_to_server({"type": "ASSET_UNLISTED", "asset_id": asset_id, "block_hash": block_hash, "owner": owner})
         except AurexError as e:
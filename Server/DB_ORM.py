@@ -13,11 +13,15 @@ from __future__ import annotations
 __author__ = "Nadav"
 
 import hashlib
+import hmac
 import json
-import random
+import queue
+import secrets
 import smtplib
 import ssl
 import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -47,9 +51,19 @@ def load_pepper() -> str:
 
 PEPPER = load_pepper()
 
+# SHA256 state with the pepper already absorbed — hash_password copies it per
+# call, so the constant prefix is hashed once per process instead of per login.
+# copy()+update() produces the exact same digest as hashing the concatenation,
+# so stored hashes stay valid.
+_PEPPER_SHA = hashlib.sha256(PEPPER.encode())
+
 EMAIL_SENDER = "@gmail.com"
 EMAIL_APP_PASSWORD = ""
 
+# Built once: ssl.create_default_context() re-reads and re-parses the system
+# CA bundle on every call, which dominated the setup cost of each reset email.
+_SMTP_SSL_CONTEXT = ssl.create_default_context()
+
 
 def send_reset_email(recipient: str, otp: str) -> bool:
     """Send a password-reset OTP to *recipient* via Gmail SMTP SSL."""
@@ -64,9 +78,8 @@ def send_reset_email(recipient: str, otp: str) -> bool:
         f"Your Code is: {otp}. "
         f"Available until {expiry.strftime('%d/%m/%Y %H:%M:%S')}."
     )
-    ctx = ssl.create_default_context()
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=ctx) as smtp:
+        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=_SMTP_SSL_CONTEXT) as smtp:
             smtp.login(EMAIL_SENDER, EMAIL_APP_PASSWORD)
             smtp.sendmail(EMAIL_SENDER, recipient, em.as_string())
         logger.info(f"[email] Reset code sent to {recipient}")
@@ -76,6 +89,16 @@ def send_reset_email(recipient: str, otp: str) -> bool:
         return False
 
 
+# Bounded LRU of past password checks.  Keyed by the STORED hash + salt plus a
+# digest of the attempt (never the plaintext), so a password change naturally
+# misses and a wrong guess can't poison anything.  Repeat logins skip the
+# pepper+salt SHA256 recompute.  Entries also expire after a TTL so a stale
+# verdict can't outlive an out-of-band credential change indefinitely.
+_VERIFY_CACHE: OrderedDict[tuple, tuple[bool, float]] = OrderedDict()
+_VERIFY_CACHE_MAX = 1024
+_VERIFY_CACHE_TTL = 30.0  # seconds
+
+
 # ── Domain models ─────────────────────────────────────────────────────────────
 
 class User:
@@ -87,6 +110,11 @@ class User:
     remain linkable.
     """
 
+    # load_users materializes one of these per user on every table read —
+    # slots drop the per-instance __dict__ (~3x smaller, faster attr access)
+    __slots__ = ("username", "email", "salt", "password_hash",
+                 "verification_code", "reset_time", "public_key", "user_status")
+
     def __init__(self, username, password, email, salt=None, public_key="",
                  verification_code=None, reset_time=None, password_hash=None,
                  user_status="ACTIVE"):
@@ -100,15 +128,37 @@ class User:
         self.user_status = str(user_status or "ACTIVE")
 
     def create_salt(self):
-        return str(random.randint(1000000, 9999999))
+        # CSPRNG, same 7-digit shape as existing stored salts
+        return str(secrets.randbelow(9000000) + 1000000)
 
     def hash_password(self, password):
-        return hashlib.sha256((PEPPER + str(password) + self.salt).encode()).hexdigest()
+        h = _PEPPER_SHA.copy()
+        h.update((str(password) + self.salt).encode())
+        return h.hexdigest()
 
     def verify_password(self, password):
         if self.is_deleted():
             return False
-        return self.password_hash == self.hash_password(password)
+        key = (
+            self.password_hash,
+            self.salt,
+            hashlib.sha256(str(password).encode()).hexdigest(),
+        )
+        now = time.monotonic()
+        hit = _VERIFY_CACHE.get(key)
+        if hit is not None:
+            result, expires = hit
+            if now < expires:
+                _VERIFY_CACHE.move_to_end(key)
+                return result
+            _VERIFY_CACHE.pop(key, None)
+        # compare_digest: constant-time over the whole hash, so response
+        # timing can't leak how many leading hex chars an attempt matched
+        result = hmac.compare_digest(self.password_hash or "", self.hash_password(password))
+        _VERIFY_CACHE[key] = (result, now + _VERIFY_CACHE_TTL)
+        if len(_VERIFY_CACHE) > _VERIFY_CACHE_MAX:
+            _VERIFY_CACHE.popitem(last=False)
+        return result
 
     def is_deleted(self) -> bool:
         return self.user_status == "DELETED"
@@ -173,6 +223,22 @@ class ORM:
     marketplace_items.json top-level key is asset_id (O(1) lookup, no nested lists).
     """
 
+    _default_instance: "ORM | None" = None
+    _default_instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls) -> "ORM":
+        """Shared ORM for the default DB paths.
+
+        The in-memory state (email/public-key indexes, reset-code map) only
+        helps if every consumer goes through the same object — construct the
+        default-path ORM once and hand it out from here.
+        """
+        with cls._default_instance_lock:
+            if cls._default_instance is None:
+                cls._default_instance = cls()
+            return cls._default_instance
+
     def __init__(self, users_json_path=None, marketplace_json_path=None, notifications_json_path=None):
         self.users_json_path = (
             Path(users_json_path) if users_json_path else DB_FOLDER / "users.json"
@@ -188,15 +254,59 @@ class ORM:
             if not path.exists():
                 path.write_text("{}", encoding="utf-8")
         self.lock = threading.RLock()
+        # email → username for active users, rebuilt only when users.json
+        # changes on disk.  Auth handlers hit this on every login/reset, and
+        # scanning every user per request scales with the whole user table.
+        self._email_index: dict[str, str] = {}
+        self._email_index_mtime: int | None = None
+        # public_key → username, same invalidation scheme.  Every blockchain
+        # confirmation resolves buyer/seller keys through this path.
+        self._pk_index: dict[str, str] = {}
+        self._pk_index_mtime: int | None = None
+        # email → (sha256 of code, expiry).  Reset codes live minutes, so
+        # they stay in memory — issuing one no longer rewrites users.json.
+        self._reset_codes: dict[str, tuple[str, float]] = {}
+        # Parsed marketplace table, reused until the file changes on disk.
+        # Mutators go through save_marketplace, which refreshes it in place.
+        self._market_cache: dict[str, dict] | None = None
+        self._market_cache_mtime: int | None = None
+        # (table object, sorted values) — valid only while the cached table
+        # object itself is current, so it expires together with it.
+        self._market_sorted: tuple[dict, list[dict]] | None = None
+        # Parsed user table, same mtime scheme as the marketplace cache.
+        # get_user/login would otherwise re-parse users.json per call.
+        self._users_cache: dict[str, User] | None = None
+        self._users_cache_mtime: int | None = None
+        # Notification writes happen on the push path (every offline event);
+        # a background writer drains them in batches so handlers don't block
+        # on a read-modify-write of notifications.json per event.
+        self._notif_queue: queue.Queue = queue.Queue(maxsize=10000)
+        threading.Thread(target=self._notification_writer_loop, daemon=True).start()
 
     # ── Users ─────────────────────────────────────────────────────────────────
 
     def load_users(self) -> dict[str, User]:
+        """Load the user table, served from cache while users.json is unchanged.
+
+        Materializing a User per row is the expensive part, and every auth
+        call goes through here.
+        """
+        try:
+            mtime = self.users_json_path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        with self.lock:
+            if self._users_cache is not None and mtime == self._users_cache_mtime:
+                return self._users_cache
         try:
             raw = json.loads(self.users_json_path.read_text(encoding="utf-8"))
             if not isinstance(raw, dict):
                 return {}
-            return {k: User.from_dict(v) for k, v in raw.items() if isinstance(v, dict)}
+            result = {k: User.from_dict(v) for k, v in raw.items() if isinstance(v, dict)}
+            with self.lock:
+                self._users_cache = result
+                self._users_cache_mtime = mtime
+            return result
         except Exception as e:
             logger.error(f"Error loading users: {e}")
             return {}
@@ -207,6 +317,11 @@ class ORM:
             for k, v in users.items()
         }
         self.users_json_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        with self.lock:
+            # Drop rather than keep `users`: the passed dict may hold raw
+            # dict rows, and the next load re-materializes clean User objects
+            self._users_cache = None
+            self._users_cache_mtime = None
 
     def add_user(self, username: str, password: str, email: str):
         """Register a new user. Checks for duplicate username and email before writing."""
@@ -219,7 +334,7 @@ class ORM:
             # Check active users only; soft-deleted username slots stay reserved
             if username in users:
                 return False, "Username already exists"
-            if any(u.email == email and not u.is_deleted() for u in users.values()):
+            if email in self._get_email_index(users):
                 return False, "Email already exists"
             users[username] = User(username, password, email)
             self.save_users(users)
@@ -234,21 +349,65 @@ class ORM:
             users[user.username] = user
             self.save_users(users)
 
+    def _get_email_index(self, users: dict[str, User] | None = None) -> dict[str, str]:
+        with self.lock:
+            try:
+                mtime = self.users_json_path.stat().st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != self._email_index_mtime:
+                if users is None:
+                    users = self.load_users()
+                self._email_index = {
+                    u.email: u.username
+                    for u in users.values()
+                    if u.email and not u.is_deleted()
+                }
+                self._email_index_mtime = mtime
+            return self._email_index
+
     def get_user_by_email(self, email: str):
         email = (email or "").strip().lower()
-        for user in self.load_users().values():
-            if user.email == email and not user.is_deleted():
-                return user
+        if not email:
+            return None
+        username = self._get_email_index().get(email)
+        if username is None:
+            return None
+        user = self.get_user(username)
+        if user is not None and user.email == email and not user.is_deleted():
+            return user
         return None
 
+    def _get_public_key_index(self, users: dict[str, User] | None = None) -> dict[str, str]:
+        with self.lock:
+            try:
+                mtime = self.users_json_path.stat().st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != self._pk_index_mtime:
+                if users is None:
+                    users = self.load_users()
+                index: dict[str, str] = {}
+                for u in users.values():
+                    if not u.public_key:
+                        continue
+                    prev = index.get(u.public_key)
+                    # An active account wins over a soft-deleted holder of
+                    # the same key (re-registered wallet).
+                    if prev is None or users[prev].is_deleted():
+                        index[u.public_key] = u.username
+                self._pk_index = index
+                self._pk_index_mtime = mtime
+            return self._pk_index
+
     def get_user_by_public_key(self, public_key: str):
         public_key = (public_key or "").strip()
         if not public_key:
             return None
-        for user in self.load_users().values():
-            if user.public_key == public_key:
-                return user
-        return None
+        username = self._get_public_key_index().get(public_key)
+        if username is None:
+            return None
+        return self.get_user(username)
 
     def resolve_username(self, public_key: str) -> str:
         """Return username for a public key. Handles soft-deleted accounts gracefully."""
@@ -265,10 +424,11 @@ class ORM:
         if not public_key:
             return False
         exclude = (exclude_username or "").strip()
-        for user in self.load_users().values():
-            if user.public_key == public_key and user.username != exclude and not user.is_deleted():
-                return True
-        return False
+        username = self._get_public_key_index().get(public_key)
+        if username is None or username == exclude:
+            return False
+        user = self.get_user(username)
+        return user is not None and not user.is_deleted()
 
     def set_user_public_key(self, username: str, public_key: str) -> bool:
         user = self.get_user(username)
@@ -282,19 +442,30 @@ class ORM:
         user = self.get_user_by_email(email)
         if not user:
             return False, "Email not found", None
-        code = str(random.randint(100000, 999999))
-        user.set_verification_code(code)
-        user.set_reset_time((datetime.now() + timedelta(minutes=minutes_valid)).isoformat())
-        self.save_user(user)
+        code = f"{secrets.randbelow(10**6):06d}"
+        digest = hashlib.sha256(code.encode()).hexdigest()
+        now = time.time()
+        with self.lock:
+            # Drop stale entries while we're here so the map stays small
+            self._reset_codes = {
+                k: v for k, v in self._reset_codes.items() if v[1] > now
+            }
+            self._reset_codes[user.email] = (digest, now + minutes_valid * 60)
         return True, "Code issued", code
 
     def verify_reset_code(self, email: str, code: str):
         user = self.get_user_by_email(email)
         if not user:
             return False, "Email not found", None
-        if user.verification_code != code:
+        with self.lock:
+            entry = self._reset_codes.get(user.email)
+        if entry is None or not hmac.compare_digest(
+            hashlib.sha256(str(code).encode()).hexdigest(), entry[0]
+        ):
             return False, "Invalid verification code", None
-        if not user.reset_time or datetime.now() >= datetime.fromisoformat(user.reset_time):
+        if time.time() >= entry[1]:
+            with self.lock:
+                self._reset_codes.pop(user.email, None)
             return False, "Code expired", None
         return True, "Code verified", user
 
@@ -306,6 +477,20 @@ class ORM:
         self.save_user(user)
         return True, "Password updated"
 
+    def update_password_with_code(self, email: str, code: str, new_password: str):
+        """Verify a reset code and set the new password in one pass.
+
+        The split verify-then-update flow resolved the same email twice (and
+        loaded the user table each time); the code check and the write belong
+        together anyway.
+        """
+        ok, message, user = self.verify_reset_code(email, code)
+        if not ok:
+            return False, message
+        user.set_password(new_password)
+        self.save_user(user)
+        return True, "Password updated"
+
     def soft_delete_user(self, username: str) -> bool:
         """Soft-delete: erase credentials, set user_status=DELETED, keep public_key."""
         username = (username or "").strip()
@@ -335,7 +520,19 @@ class ORM:
     # ── Marketplace ───────────────────────────────────────────────────────────
 
     def load_marketplace(self) -> dict[str, dict]:
-        """Load marketplace JSON. Top-level key is asset_id → asset_dict."""
+        """Load marketplace JSON. Top-level key is asset_id → asset_dict.
+
+        Serves the parsed table from cache while the file's mtime is
+        unchanged — every marketplace operation goes through here, and the
+        per-item normalization below is the expensive part.
+        """
+        try:
+            mtime = self.marketplace_json_path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        with self.lock:
+            if self._market_cache is not None and mtime == self._market_cache_mtime:
+                return self._market_cache
         try:
             raw = json.loads(self.marketplace_json_path.read_text(encoding="utf-8"))
             if not isinstance(raw, dict):
@@ -354,6 +551,9 @@ class ORM:
                 if sp and not Path(sp).is_absolute():
                     item_dict["storage_path"] = str(DB_FOLDER / sp)
                 result[str(aid)] = item_dict
+            with self.lock:
+                self._market_cache = result
+                self._market_cache_mtime = mtime
             return result
         except Exception:
             return {}
@@ -362,6 +562,12 @@ class ORM:
         self.marketplace_json_path.write_text(
             json.dumps(market, ensure_ascii=False, indent=2), encoding="utf-8"
         )
+        with self.lock:
+            # Drop the cache rather than keeping `market`: entries written by
+            # add_asset carry DB-relative storage paths that only load-time
+            # normalization makes absolute again.
+            self._market_cache = None
+            self._market_cache_mtime = None
 
     def add_asset(self, username: str, asset: MarketplaceItem) -> bool:
         _ = username  # owner is stored inside asset.owner
@@ -383,6 +589,28 @@ class ORM:
         assets.sort(key=lambda a: a.created_at, reverse=True)
         return assets
 
+    def get_all_asset_dicts(self) -> list[dict]:
+        """All assets as plain dicts, newest first.
+
+        load_marketplace already normalizes every entry through
+        MarketplaceItem, so callers that only re-serialize (GET_ITEMS) can
+        skip building and unpacking a dataclass per asset.  The sorted list
+        is memoized against the cached table: every marketplace browse hits
+        this, and re-sorting an unchanged table is pure waste.
+        """
+        market = self.load_marketplace()
+        with self.lock:
+            if self._market_sorted is not None and self._market_sorted[0] is market:
+                return self._market_sorted[1]
+        dicts = sorted(
+            market.values(),
+            key=lambda d: str(d.get("created_at", "")),
+            reverse=True,
+        )
+        with self.lock:
+            self._market_sorted = (market, dicts)
+        return dicts
+
     _MARKETPLACE_STATUSES = (ASSET_STATUS_MINTED, ASSET_STATUS_LISTED)
 
     def get_all_for_sale_assets(self) -> list[MarketplaceItem]:
@@ -397,7 +625,40 @@ class ORM:
         return assets
 
     def get_all_for_sale_asset_ids(self) -> list[dict]:
-        return [{"id": a.asset_id, "version": a.version} for a in self.get_all_for_sale_assets() if a.asset_id]
+        """{id, version} rows for the marketplace version poll.
+
+        Clients hit this constantly to detect stale grids; building a full
+        MarketplaceItem per asset just to read two fields is wasted work, so
+        the rows come straight from the cached raw table.
+        """
+        market = self.load_marketplace()
+        rows = [
+            (str(d.get("created_at", "")), {"id": str(d.get("asset_id", "")), "version": int(d.get("version", 1))})
+            for d in market.values()
+            if isinstance(d, dict)
+            and d.get("asset_status") in self._MARKETPLACE_STATUSES
+            and d.get("asset_id")
+        ]
+        rows.sort(key=lambda r: r[0], reverse=True)
+        return [row for _, row in rows]
+
+    def get_user_asset_ids(self, username: str) -> list[dict]:
+        """{id, version} rows for the My Assets version poll — same raw-table
+        extraction as get_all_for_sale_asset_ids."""
+        username = (username or "").strip()
+        if not username:
+            return []
+        market = self.load_marketplace()
+        rows = [
+            (str(d.get("created_at", "")), {"id": str(d.get("asset_id", "")), "version": int(d.get("version", 1))})
+            for d in market.values()
+            if isinstance(d, dict)
+            and d.get("owner") == username
+            and d.get("asset_status") not in self._MARKETPLACE_STATUSES
+            and d.get("asset_id")
+        ]
+        rows.sort(key=lambda r: r[0], reverse=True)
+        return [row for _, row in rows]
 
     def update_asset_status(self, asset_id: str, status: str,
                             increment_version: bool = False) -> bool:
@@ -582,13 +843,35 @@ class ORM:
         username = str(username or "").strip()
         if not username:
             return
+        self._notif_queue.put((username, str(msg)))
+
+    def _notification_writer_loop(self):
+        while True:
+            first = self._notif_queue.get()
+            self._drain_notification_queue(first)
+
+    def _drain_notification_queue(self, first=None):
+        """Write everything currently queued in one file round-trip.
+
+        Also called from peek/flush so readers observe their own just-queued
+        events even if the writer thread hasn't woken yet.
+        """
+        batch = [] if first is None else [first]
+        while True:
+            try:
+                batch.append(self._notif_queue.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return
         with self.lock:
             data = self.load_notifications()
-            items = data.get(username, [])
-            if not isinstance(items, list):
-                items = []
-            items.append({"msg": str(msg)})
-            data[username] = items
+            for username, msg in batch:
+                items = data.get(username, [])
+                if not isinstance(items, list):
+                    items = []
+                items.append({"msg": msg})
+                data[username] = items
             self.save_notifications(data)
 
     def peek_notifications(self, username: str) -> list[str]:
@@ -596,6 +879,7 @@ class ORM:
         username = str(username or "").strip()
         if not username:
             return []
+        self._drain_notification_queue()
         with self.lock:
             data = self.load_notifications()
             items = data.get(username, [])
@@ -608,6 +892,7 @@ class ORM:
         username = str(username or "").strip()
         if not username:
             return []
+        self._drain_notification_queue()
         with self.lock:
             data = self.load_notifications()
             items = data.get(username, [])
@@ -15,6 +15,7 @@ import shutil
 import sys
 import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
@@ -49,6 +50,10 @@ from SharedResources.exceptions import (
 
 logger = Logger(__file__)
 
+# Compiled once — signup validation runs per request and re.match would
+# re-hit the regex cache (and re-parse on cache eviction) every time.
+_USERNAME_RE = re.compile(r"^[a-zA-Z0-9_]{3,20}$")
+
 
 class _ProtocolError(Exception):
     """Internal exception used by _require() to abort a handler early."""
@@ -154,18 +159,60 @@ class Server:
     defined in SharedResources/classes.py.
     """
 
+    # Message type → handler method name.  Defined once at class scope;
+    # __init__ binds them so dispatch stays a plain dict hit.
+    _HANDLER_NAMES = {
+        "START": "handle_start",
+        "LOGIN": "handle_login",
+        "SIGNUP": "handle_signup",
+        "SEND_CODE": "handle_send_code",
+        "SENDCODE": "handle_send_code",
+        "VERIFY_CODE": "handle_verify_code",
+        "VERFYCODE": "handle_verify_code",
+        "UPDATE_PASSWORD": "handle_update_password",
+        "LOGOUT": "handle_logout",
+        "UPLOAD": "handle_upload",
+        "UPLOAD_INIT": "handle_upload_init",
+        "UPLOAD_FINISH": "handle_upload_finish",
+        "GET_ITEMS": "handle_get_items",
+        "UPDATE_PUBLIC_KEY": "handle_update_public_key",
+        "REGISTER_GATEWAY": "handle_register_gateway",
+        "BUY_ASSET": "handle_buy_asset",
+        "BUY_SUCCESS": "handle_buy_success",
+        "BUY_FAILED": "handle_buy_failed",
+        "SELL_SUCCESS": "handle_sell_success",
+        "BLOCK_REJECTED": "handle_block_rejected",
+        "SEND_BALANCE": "handle_send_balance",
+        "GET_ASSETS_IDS": "handle_get_assets_ids",
+        "GET_ASSET_BY_ID": "handle_get_asset_by_id",
+        "DELETE_ACCOUNT": "handle_delete_account",
+        "DELETE_ASSET": "handle_delete_asset",
+        "GET_BALANCE": "handle_get_balance",
+        "FULLY_UPLOAD": "handle_fully_upload",
+        "ASSET_UNLISTED": "handle_asset_unlisted",
+        "MOVE_TO_MARKETPLACE": "handle_move_to_marketplace",
+        "UNLIST_ASSET": "handle_unlist_asset",
+        "CLEAR_NOTIFICATIONS": "handle_clear_notifications",
+    }
+
     def __init__(self, host=SERVER_IP, port=SERVER_PORT):
         self.host = host
         self.port = int(port)
-        self.db = ORM()
+        self.db = ORM.instance()
         self.upload_sessions = {}
         self.upload_lock = threading.Lock()
         self.gateway_comm = None          # single gateway connection
         self.gateway_lock = threading.RLock()
         self.online_users: dict[str, object] = {}
-        self.online_users_lock = threading.RLock()
+        # Plain Lock (not RLock): acquisitions are all tiny non-nested
+        # get/set/pop blocks, and Lock skips RLock's owner bookkeeping.
+        self.online_users_lock = threading.Lock()
         self._active_buys: dict[str, str] = {}       # asset_id -> buyer; one BUY in flight per asset
         self._active_buys_lock = threading.Lock()
+        # Shared worker pool for outbound reset emails: reuses a couple of
+        # long-lived threads instead of paying thread spawn per request, and
+        # caps how many concurrent SMTP sessions we open against Gmail.
+        self._email_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="email")
         self.client_listener = RSA_Server(
             self.host, self.port,
             dir_for_keys=_SERVER_KEYS_DIR,
@@ -175,37 +222,8 @@ class Server:
         self.logger = logger
         self.client_listener.handle_client = self.handle_client
         self.handlers = {
-            "START": self.handle_start,
-            "LOGIN": self.handle_login,
-            "SIGNUP": self.handle_signup,
-            "SEND_CODE": self.handle_send_code,
-            "SENDCODE": self.handle_send_code,
-            "VERIFY_CODE": self.handle_verify_code,
-            "VERFYCODE": self.handle_verify_code,
-            "UPDATE_PASSWORD": self.handle_update_password,
-            "LOGOUT": self.handle_logout,
-            "UPLOAD": self.handle_upload,
-            "UPLOAD_INIT": self.handle_upload_init,
-            "UPLOAD_FINISH": self.handle_upload_finish,
-            "GET_ITEMS": self.handle_get_items,
-            "UPDATE_PUBLIC_KEY": self.handle_update_public_key,
-            "REGISTER_GATEWAY": self.handle_register_gateway,
-            "BUY_ASSET": self.handle_buy_asset,
-            "BUY_SUCCESS": self.handle_buy_success,
-            "BUY_FAILED": self.handle_buy_failed,
-            "SELL_SUCCESS": self.handle_sell_success,
-            "BLOCK_REJECTED": self.handle_block_rejected,
-            "SEND_BALANCE": self.handle_send_balance,
-            "GET_ASSETS_IDS": self.handle_get_assets_ids,
-            "GET_ASSET_BY_ID": self.handle_get_asset_by_id,
-            "DELETE_ACCOUNT": self.handle_delete_account,
-            "DELETE_ASSET": self.handle_delete_asset,
-            "GET_BALANCE": self.handle_get_balance,
-            "FULLY_UPLOAD": self.handle_fully_upload,
-            "ASSET_UNLISTED": self.handle_asset_unlisted,
-            "MOVE_TO_MARKETPLACE": self.handle_move_to_marketplace,
-            "UNLIST_ASSET": self.handle_unlist_asset,
-            "CLEAR_NOTIFICATIONS": self.handle_clear_notifications,
+            msg_type: getattr(self, name)
+            for msg_type, name in self._HANDLER_NAMES.items()
         }
 
     def start(self):
@@ -227,10 +245,10 @@ class Server:
         self.logger.info("Client connected")
         comm.start_async(default_encryption=True)
         while True:
-            msg = comm.recv_async(timeout=0.25)
-            if msg is None:
-                continue
-            if comm.is_close_marker(msg):
+            # Block until a message (or the close marker) arrives — no
+            # polling wakeups while the connection is idle.
+            msg = comm.recv_async()
+            if msg is None or comm.is_close_marker(msg):
                 self.logger.info("Client disconnected")
                 with self.gateway_lock:
                     if self.gateway_comm is comm:
@@ -267,8 +285,13 @@ class Server:
         """
         if not isinstance(msg, dict):
             return {"type": "ERROR", "message": "Invalid message format"}
-        action = str(msg.get("type", "")).strip().upper()
+        action = msg.get("type")
+        # Fast path: the client always sends canonical upper-case types, so
+        # try the raw value first and only pay strip().upper() for oddballs.
         handler = self.handlers.get(action)
+        if handler is None:
+            action = str(action or "").strip().upper()
+            handler = self.handlers.get(action)
         if not handler:
             return {"type": "ERROR", "message": f"Unknown operation: {action}"}
         return handler(comm, msg)
@@ -279,14 +302,35 @@ class Server:
         _ = index
         return msg.get(key, default)
 
+    # Shared instances of the constant acks ({"type": "READY"}, CODE_SENT,
+    # CHUNK_RECEIVED, ...).  Handlers never mutate their responses, so the
+    # same dict can be returned for every request instead of a fresh one.
+    _CONST_RESPONSES: dict = {}
+
     def _success(self, event_type, **extra):
+        if not extra:
+            resp = Server._CONST_RESPONSES.get(event_type)
+            if resp is None:
+                resp = Server._CONST_RESPONSES[event_type] = {"type": event_type}
+            return resp
         payload = {"type": event_type}
         payload.update(extra)
         return payload
 
+    # Same idea for errors: fixed texts ("Missing email", gateway offline...)
+    # recur on every bad request, so reuse one dict per distinct message.
+    # Capped so one-off exception texts can't grow the map unboundedly.
+    _CONST_ERRORS: dict = {}
+    _CONST_ERRORS_MAX = 64
+
     def _fail(self, *args):
-        message = args[-1]
-        return {"type": "ERROR", "message": str(message)}
+        message = str(args[-1])
+        resp = Server._CONST_ERRORS.get(message)
+        if resp is None:
+            resp = {"type": "ERROR", "message": message}
+            if len(Server._CONST_ERRORS) < self._CONST_ERRORS_MAX:
+                Server._CONST_ERRORS[message] = resp
+        return resp
 
     def _gateway_required(self):
         """
@@ -370,8 +414,9 @@ class Server:
         msg_text = event.get("msg") or "; ".join(f"{k}={v}" for k, v in event.items() if k != "type")
         if persist:
             self.db.queue_notification(username, msg_text)
-        with self.online_users_lock:
-            online_comm = self.online_users.get(username)
+        # Single-key dict reads are atomic under the GIL — no lock needed for
+        # a plain lookup (the compare-and-pop below still takes it).
+        online_comm = self.online_users.get(username)
         if online_comm is None:
             if not persist:
                 self.db.queue_notification(username, msg_text)
@@ -521,7 +566,7 @@ class Server:
 
     def _validate_signup_fields(self, username: str, password: str, email: str):
         self._require_fields(username, password, email, msg="Missing required fields")
-        if not re.match(r"^[a-zA-Z0-9_]{3,20}$", username):
+        if not _USERNAME_RE.match(username):
             raise ValidationError("Username must be 3-20 alphanumeric/underscore characters")
         if len(password) < 6:
             raise ValidationError("Password must be at least 6 characters")
@@ -560,7 +605,9 @@ class Server:
             file_type=session.file_type,
             cost=session.cost,
             storage_path=str(file_path),
-            created_at=datetime.now().isoformat(),
+            # The upload session already stamped created_at at UPLOAD_INIT —
+            # reuse it rather than formatting a second, slightly later one
+            created_at=session.created_at,
             public_key=public_key,
         )
 
@@ -597,13 +644,6 @@ class Server:
         # Tell all online clients a new asset appeared so their marketplace grids auto-refresh
         self._push_to_all_online({"type": "ASSET_LISTED", "asset_id": asset_id})
 
-    def _verify_reset_code_or_raise(self, email: str, code: str):
-        ok, message, _ = self.db.verify_reset_code(email, code)
-        if not ok:
-            if "expired" in message.lower():
-                raise ValidationError("Code expired — press 'Send Code' to get a new one")
-            raise ValidationError("Invalid verification code")
-
     # ── Handlers ──────────────────────────────────────────────────────────────
 
     def handle_start(self, comm, msg):
@@ -649,7 +689,7 @@ class Server:
         ok, message, code = self.db.issue_reset_code(email)
         if not ok:
             return self._fail("CODE_FAILED", message)
-        threading.Thread(target=send_reset_email, args=(email, code), daemon=True).start()
+        self._email_executor.submit(send_reset_email, email, code)
         return self._success("CODE_SENT")
 
     def handle_verify_code(self, comm, msg):
@@ -672,9 +712,12 @@ class Server:
             self._require_fields(email, new_password, code, msg="Missing email/code/new_password")
             if len(new_password) < 6:
                 raise ValidationError("Password must be at least 6 characters")
-            self._verify_reset_code_or_raise(email, code)
-            ok, update_msg = self.db.update_password_by_email(email, new_password)
+            ok, update_msg = self.db.update_password_with_code(email, code, new_password)
             if not ok:
+                if "expired" in update_msg.lower():
+                    raise ValidationError("Code expired — press 'Send Code' to get a new one")
+                if "code" in update_msg.lower():
+                    raise ValidationError("Invalid verification code")
                 raise ValidationError(update_msg)
             return self._success("PASSWORD_UPDATED")
         except AurexError as e:
@@ -764,7 +807,7 @@ class Server:
 
     def handle_get_items(self, comm, msg):
         _ = comm, msg
-        items = [item.to_dict() for item in self.db.get_all_assets()]
+        items = self.db.get_all_asset_dicts()
         return self._success("ITEMS_LIST", items=items)
 
     def handle_update_public_key(self, comm, msg):
@@ -867,12 +910,9 @@ class Server:
                 return self._success("BUY_ACKNOWLEDGED")
             # Real race: a different buyer won — notify loser and refresh their balance
             if buyer_name:
-                asset_label = asset_id
-                if asset_id:
-                    try:
-                        asset_label = self._find_asset(asset_id).asset_name
-                    except Exception:
-                        pass
+                # Reuse the lookup from the duplicate check above instead of
+                # fetching the same asset a second time for its name
+                asset_label = (asset.asset_name or asset_id) if asset else asset_id
                 self._push_event(buyer_name, {
                     "type": "BUY_FAILED", "asset_id": asset_id,
                     "msg": f"'{asset_label}' was just purchased by someone else",
@@ -1116,11 +1156,12 @@ class Server:
     def handle_get_assets_ids(self, comm, msg):
         _ = comm
         username = str(msg.get("username") or "").strip()
+        # Version polls only need {id, version} pairs — the ORM extracts them
+        # from the raw table without a MarketplaceItem round-trip per asset.
         if username:
-            items = self.db.get_assets_for_user(username)
+            ids = self.db.get_user_asset_ids(username)
         else:
-            items = self.db.get_all_for_sale_assets()
-        ids = [{"id": item.asset_id, "version": getattr(item, "version", 1)} for item in items if item.asset_id]
+            ids = self.db.get_all_for_sale_asset_ids()
         return self._success("ASSETS_IDS_LIST", ids=ids)
 
     def handle_get_asset_by_id(self, comm, msg):
@@ -1129,30 +1170,30 @@ class Server:
             comm.send_async({"type": "ERROR", "message": "Missing asset id"})
             return None
 
-        item = None
-        for a in self.db.get_all_assets():
-            if a.asset_id == asset_id:
-                item = a
-                break
-
+        # marketplace_items.json is keyed by asset_id — point lookup, not a
+        # scan of every asset (each of which costs a dataclass round-trip)
+        item = self.db.find_asset_by_id(asset_id)
         if not item:
             comm.send_async({"type": "ERROR", "message": "Asset not found"})
             return None
 
-        content_b64 = ""
         try:
             raw = Path(item.storage_path).read_bytes()
-            content_b64 = base64.b64encode(raw).decode("ascii")
         except Exception:
             comm.send_async({"type": "ERROR", "message": "Asset file not found"})
             return None
 
-        chunk_size = 32_000
-        chunks = [content_b64[i: i + chunk_size] for i in range(0, len(content_b64), chunk_size)] or [""]
+        # Encode per chunk instead of building one whole-file b64 string and
+        # slicing it.  24000 is a multiple of 3, so the per-chunk b64 pieces
+        # concatenate to exactly what one full encode would give — the client
+        # joins them before decoding.
+        chunk_size = 24_000
+        view = memoryview(raw)
+        total_chunks = max(1, (len(raw) + chunk_size - 1) // chunk_size)
 
         comm.send_async({
             "type": "ASSET_INIT",
-            "total_chunks": len(chunks),
+            "total_chunks": total_chunks,
             "file_type": item.file_type,
             "version": getattr(item, "version", 1),
             "owner": item.owner,
@@ -1163,8 +1204,12 @@ class Server:
             "public_key": getattr(item, "public_key", ""),
             "asset_status": getattr(item, "asset_status", ASSET_STATUS_UPLOADED),
         })
-        for chunk in chunks:
-            comm.send_async({"type": "ASSET_CHUNK", "chunk_b64": chunk})
+        for i in range(total_chunks):
+            piece = view[i * chunk_size: (i + 1) * chunk_size]
+            comm.send_async({
+                "type": "ASSET_CHUNK",
+                "chunk_b64": base64.b64encode(piece).decode("ascii"),
+            })
         comm.send_async({"type": "ASSET_END"})
         return None
 
@@ -1231,5 +1276,5 @@ if __name__ == "__main__":
     _Logger.set_level(_args.debug_level)
 
     server = Server()
-    print(f"[*] Starting ServerUpdated on {SERVER_IP}:{SERVER_PORT}...")
+    _Logger(__file__).info(f"[*] Starting ServerUpdated on {SERVER_IP}:{SERVER_PORT}...")
     server.start()
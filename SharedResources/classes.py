@@ -1,5 +1,6 @@
 __author__ = "Nadav"
 
+import logging
 import time
 from dataclasses import dataclass, asdict
 from datetime import datetime
@@ -22,6 +23,55 @@ from cryptography.hazmat.primitives.serialization import load_pem_parameters, lo
 
 from SharedResources.logging import Logger, CYAN, RESET
 
+# Length-prefix header: 2-byte big-endian, compiled once so the per-message
+# pack/unpack skips the format-string parse.
+_LEN_HDR = struct.Struct('!H')
+
+# Socket buffer size for message connections — large enough that asset
+# chunks stay in flight without the default kernel window capping throughput.
+SOCKET_BUF_SIZE = 256 * 1024
+
+
+def tune_tcp_socket(sock):
+    """Disable Nagle and widen kernel buffers on a TCP socket.
+
+    The protocol is many small length-prefixed messages, so Nagle coalescing
+    only adds latency.  Safe to call on any socket; failures are ignored
+    (e.g. non-TCP sockets or platforms without the option).
+    """
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUF_SIZE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUF_SIZE)
+    except OSError:
+        pass
+    if hasattr(socket, "TCP_QUICKACK"):
+        # Linux-only: ACK the handshake/first frames immediately instead of
+        # waiting out the delayed-ACK timer
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+        except OSError:
+            pass
+
+
+class _LazyPayload:
+    """Defers sanitize/format of a logged message until a handler renders it.
+
+    The logging module only calls __str__ on %-args for records that actually
+    reach a handler, so messages dropped by NoiseFilter cost nothing.
+    """
+    __slots__ = ('comm', 'data')
+
+    def __init__(self, comm, data):
+        self.comm = comm
+        self.data = data
+
+    def __str__(self):
+        if isinstance(self.data, dict):
+            return self.comm._format_log_payload(self.comm.sanitize_for_log(self.data))
+        return str(self.data)
+
+
 class Communication:
     @staticmethod
     def _format_log_payload(d: dict) -> str:
@@ -36,17 +86,19 @@ class Communication:
         return "{" + ", ".join(parts) + "}"
 
     def log(self, dirct, data: dict):
+        # Skip the payload sanitizing/formatting and getpeername() work
+        # entirely when INFO is filtered out — this runs on every message
+        # sent/received.
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         try:
             ip, port = self.sock.getpeername()
             addr = f"{ip}:{port}"
         except Exception:
             addr = "?"
         label = self.peer_label or "Peer"
-        payload = self._format_log_payload(data) if isinstance(data, dict) else str(data)
-        if dirct == 'recv':
-            self.logger.info(f"Recv From {label} at {addr} <<< {payload}")
-        else:
-            self.logger.info(f"Sent to {label} at {addr} >>> {payload}")
+        template = "Recv From %s at %s <<< %s" if dirct == 'recv' else "Sent to %s at %s >>> %s"
+        self.logger.info(template, label, addr, _LazyPayload(self, data))
 
     def __init__(self, sock, name="", peer_label=""):
         self.sock = sock
@@ -61,6 +113,8 @@ class Communication:
         self.AES_key = None
 
         self.user = None
+        self._tx_hdr = bytearray(2)         # reusable length-prefix buffer for sends
+        self._rx_pending = bytearray()      # bytes read off the socket but not yet framed
         self.msg_queue = queue.Queue()
         self.send_queue = queue.Queue()
         self.async_running = False
@@ -75,6 +129,7 @@ class Communication:
         
 
     def connect(self, ip, port):
+        tune_tcp_socket(self.sock)
         self.sock.connect((ip, port))
 
     def AES_encrypt(self, plaintext: bytes, key: bytes, iv: bytes) -> bytes:
@@ -101,37 +156,55 @@ class Communication:
                 out[k] = v
         return out
 
-    def send_one_message(self, data: dict, encryption=True):
-        data_json = json.dumps(data, sort_keys=True).encode()
+    def _encode_message(self, data: dict, encryption=True) -> bytes:
+        """Serialize (and optionally encrypt) one message body, without framing."""
+        # Compact separators; no sort_keys — nothing on the wire depends on
+        # key order and sorting every payload costs a keys()+sort per message.
+        data_json = json.dumps(data, separators=(',', ':')).encode()
         if encryption:
             iv = self.generate_iv()
-            message = iv + self.AES_encrypt(data_json, self.AES_key, iv)
-        else:
-            message = data_json
+            return iv + self.AES_encrypt(data_json, self.AES_key, iv)
+        return data_json
+
+    def send_one_message(self, data: dict, encryption=True):
+        message = self._encode_message(data, encryption=encryption)
         with self.lock:
-            self.sock.sendall(struct.pack('!H', len(message)) + message)
-        self.log('send', self.sanitize_for_log(data))
+            _LEN_HDR.pack_into(self._tx_hdr, 0, len(message))
+            try:
+                # Vectored send: kernel gathers header+payload, no concat copy
+                sent = self.sock.sendmsg([self._tx_hdr, message])
+            except (AttributeError, NotImplementedError):
+                self.sock.sendall(bytes(self._tx_hdr) + message)
+            else:
+                # sendmsg may send partially on large payloads — push the rest
+                if sent < 2:
+                    self.sock.sendall(memoryview(self._tx_hdr)[sent:])
+                    self.sock.sendall(message)
+                elif sent < len(message) + 2:
+                    self.sock.sendall(memoryview(message)[sent - 2:])
+        self.log('send', data)
 
 
     def recv_one_message(self, encryption=True):
         with self.recv_lock:
-            len_section = self.recv_amount(2)
-            if not len_section:
+            if not self._fill_rx_pending(2):
                 return None
-
-            length, = struct.unpack('!H', len_section)
-            data = self.recv_amount(length)
-
-        if not data or len(data) != length:
-            return None
+            length, = _LEN_HDR.unpack_from(self._rx_pending)
+            if not self._fill_rx_pending(2 + length):
+                return None
+            data = bytes(self._rx_pending[2:2 + length])
+            del self._rx_pending[:2 + length]
 
         if encryption:
-            iv   = data[:16]
-            data = self.AES_decrypt(data[16:], self.AES_key, iv)
+            # Slice the ciphertext through a memoryview — data[16:] would
+            # copy the whole payload just to drop the IV prefix
+            view = memoryview(data)
+            data = self.AES_decrypt(view[16:], self.AES_key, bytes(view[:16]))
 
         try:
-            decoded = json.loads(data.decode())
-            self.log('recv', self.sanitize_for_log(decoded))
+            # json.loads handles bytes directly — no separate str copy first
+            decoded = json.loads(data)
+            self.log('recv', decoded)
             return decoded
         except Exception as e:
             self.logger.error(f"Error decoding JSON: {e}")
@@ -157,20 +230,91 @@ class Communication:
         self.msg_queue.put(self.close_marker)
         self.async_running = False
 
+    # Coalescing caps for the async writer: bound the number of messages and
+    # total bytes merged into a single send so one burst can't starve the peer.
+    MAX_SEND_BATCH = 32
+    MAX_SEND_BATCH_BYTES = 64 * 1024
+
+    # How much to pull off the socket per recv — large enough that a burst of
+    # small frames arrives in one syscall and is framed out of _rx_pending.
+    RECV_CHUNK = 64 * 1024
+
     def send_loop(self):
         while not self.async_stop_event.is_set():
             item = self.send_queue.get()
             if item is None:
                 break
-            data, encryption = item
-            enc = self.default_encryption if encryption is None else bool(encryption)
-            try:
-                self.send_one_message(data, encryption=enc)
-            except Exception:
+            # Coalesce whatever is already queued so a fan-out burst goes to
+            # the kernel as one write instead of one syscall per message.
+            stop = False
+            frames, sent_payloads, total = [], [], 0
+            entry = item
+            while True:
+                if entry is None:
+                    stop = True
+                    break
+                data, encryption = entry
+                enc = self.default_encryption if encryption is None else bool(encryption)
+                try:
+                    message = self._encode_message(data, encryption=enc)
+                except Exception:
+                    stop = True
+                    break
+                frames.append(_LEN_HDR.pack(len(message)))
+                frames.append(message)
+                sent_payloads.append(data)
+                total += len(message) + 2
+                if len(sent_payloads) >= self.MAX_SEND_BATCH or total >= self.MAX_SEND_BATCH_BYTES:
+                    break
+                try:
+                    entry = self.send_queue.get_nowait()
+                except queue.Empty:
+                    break
+            if frames:
+                try:
+                    # Single-writer invariant: once start_async is running, every
+                    # send on this connection goes through send_queue and is
+                    # written by this thread only, so the send lock is not taken
+                    # here.  Direct send_one_message callers keep using the lock
+                    # on connections that never entered async mode.
+                    self._send_frames(frames, total)
+                except Exception:
+                    break
+                for data in sent_payloads:
+                    self.log('send', data)
+            if stop:
                 break
         self.async_running = False
 
+    def _send_frames(self, frames, total):
+        """Write a batch of [header, body, header, body, ...] buffers.
+
+        sendmsg hands the buffer list to the kernel as one scatter-gather
+        write, so the batch never gets joined into a combined copy in user
+        space.  Falls back to join+sendall where sendmsg is unavailable.
+        """
+        try:
+            sent = self.sock.sendmsg(frames)
+        except (AttributeError, NotImplementedError):
+            self.sock.sendall(b''.join(frames))
+            return
+        if sent >= total:
+            return
+        # Partial write: skip the buffers that went out, finish the rest.
+        for buf in frames:
+            if sent >= len(buf):
+                sent -= len(buf)
+                continue
+            self.sock.sendall(memoryview(buf)[sent:] if sent else buf)
+            sent = 0
+
     def send_async(self, data: dict, encryption=None):
+        """Queue a message for the writer thread.
+
+        While async mode is active the writer thread is the sole socket
+        writer; callers must not mix in direct send_one_message calls on
+        the same connection.
+        """
         if not self.async_running:
             enc = self.default_encryption if encryption is None else bool(encryption)
             self.send_one_message(data, encryption=enc)
@@ -197,18 +341,33 @@ class Communication:
         except Exception:
             pass
 
-    def recv_amount(self, size):
-        buffer = b''
-        while size:
+    # Zero block used to extend _rx_pending before recv_into — reused so the
+    # extension never allocates a fresh source buffer.
+    _RX_ZEROS = bytes(RECV_CHUNK)
+
+    def _fill_rx_pending(self, needed):
+        """Read from the socket until ``_rx_pending`` holds ``needed`` bytes.
+
+        Reads up to RECV_CHUNK at a time directly into the tail of
+        ``_rx_pending`` via ``recv_into``, so several back-to-back frames
+        land in one syscall with no intermediate bytes object per recv.
+        Returns False on EOF or connection error.
+        """
+        while len(self._rx_pending) < needed:
+            start = len(self._rx_pending)
+            self._rx_pending += self._RX_ZEROS
+            n = 0
             try:
-                new_buffer = self.sock.recv(size)
-                if not new_buffer:
-                    return None
-                buffer += new_buffer
-                size -= len(new_buffer)
+                n = self.sock.recv_into(memoryview(self._rx_pending)[start:])
             except ConnectionError:
-                return None
-        return buffer
+                pass
+            finally:
+                # Always trim the zero padding — also on timeouts/other
+                # OSErrors that propagate to the caller
+                del self._rx_pending[start + n:]
+            if not n:
+                return False
+        return True
     
 
     @staticmethod
@@ -231,6 +390,7 @@ class RSA_Client:
         self.ip = ip
         self.port = port
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        tune_tcp_socket(self.sock)
         self.communication = Communication(sock=self.sock, name=name, peer_label=peer_label)
         
     def start(self):
@@ -299,21 +459,63 @@ class RSA_Server:
         self.name = name
         self.peer_label = peer_label
         self.dir_for_keys = dir_for_keys
+        self.RSA_private_key = None
+        self.RSA_public_key = None
+        self._public_key_b64 = None   # cached base64 PEM sent in every handshake
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Rebind immediately after a restart instead of waiting out TIME_WAIT;
+        # SO_REUSEPORT additionally lets several listeners share the port on
+        # platforms that support it (kernel load-balances the accepts).
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            try:
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            except OSError:
+                pass
         self.sock.bind((self.ip, self.port))
-        self.sock.listen(5 if not Gateway else 10)
+        # A short backlog (5/10) drops SYNs whenever accepts lag behind a
+        # burst, e.g. every client reconnecting after a server restart.
+        self.sock.listen(128)
+        if dir_for_keys:
+            # Load/generate the key pair and the handshake payload up front so
+            # the first client doesn't pay PEM parsing inside its handshake.
+            # (Bnode assigns dir_for_keys after construction; those servers
+            # keep the lazy path.)
+            self.create_RSA_keys(dir_for_keys)
+            self._public_key_b64 = base64.b64encode(self.get_public_key_RSA()).decode("ascii")
+
+    # Per-connection threads don't need the platform default stack (8 MiB on
+    # Linux) — 1 MiB is ample for handler code and cuts per-client memory 8x.
+    CLIENT_THREAD_STACK = 1024 * 1024
+
+    # A peer that connects but never completes the key exchange would
+    # otherwise pin its thread forever on a blocking recv.
+    HANDSHAKE_TIMEOUT = 5.0
 
     def start(self):
+        try:
+            threading.stack_size(self.CLIENT_THREAD_STACK)
+        except (ValueError, RuntimeError):
+            pass
         while True:
             self.client_sock, addr = self.sock.accept()
+            # Accepted sockets need the same tuning the connect side gets —
+            # otherwise server-side Nagle still delays small replies
+            tune_tcp_socket(self.client_sock)
             t = threading.Thread(target=self.communicate_with_client, daemon=True, args=(self.client_sock,))
             t.start()
-        
+
 
     def communicate_with_client(self, client_socket):
         communication = Communication(client_socket, name=self.name, peer_label=self.peer_label)
-        self.contact_with_RSA(communication)
-        
+        client_socket.settimeout(self.HANDSHAKE_TIMEOUT)
+        try:
+            self.contact_with_RSA(communication)
+        except OSError as exc:
+            communication.logger.error(f"RSA handshake failed: {exc} — closing connection")
+            communication.close()
+            return
+        client_socket.settimeout(None)
         self.handle_client(communication)
 
     def handle_client(self, communication): #will gonna be ovveridden
@@ -327,11 +529,13 @@ class RSA_Server:
             return
         if answer["type"] == "SEND_PUBLIC_KEY":
             self.create_RSA_keys(self.dir_for_keys)
-            public_key = self.get_public_key_RSA()
+            if self._public_key_b64 is None:
+                # Serialize + base64 the PEM once; it is identical for every client
+                self._public_key_b64 = base64.b64encode(self.get_public_key_RSA()).decode("ascii")
 
             msg = {
                 "type": "GET_PUBLIC_KEY",
-                "value": base64.b64encode(public_key).decode("ascii"),
+                "value": self._public_key_b64,
             }
 
             communication.send_one_message(msg, False)
@@ -342,8 +546,22 @@ class RSA_Server:
                 communication.send_one_message({"type": "OK"})
 
     
+    # dir_for_keys → (private key, public key).  Several servers can live in
+    # one process (gateway relay + blockchain nodes in tests), so parsed key
+    # objects are shared per directory rather than re-read per instance.
+    _key_cache = {}
+
     def create_RSA_keys(self, dir_for_keys="ServerKeys"):
+        # The key pair never changes at runtime — load/generate it once and
+        # reuse it for every client handshake instead of re-reading and
+        # re-parsing the PEM files per connection.
+        if self.RSA_private_key is not None and dir_for_keys == self.dir_for_keys:
+            return
         self.dir_for_keys = dir_for_keys
+        cached = RSA_Server._key_cache.get(dir_for_keys)
+        if cached is not None:
+            self.RSA_private_key, self.RSA_public_key = cached
+            return
         if not os.path.exists(dir_for_keys):
             os.makedirs(dir_for_keys)
         private_key_path = os.path.join(dir_for_keys, "private_key.pem")
@@ -357,8 +575,9 @@ class RSA_Server:
                 )
             with open(public_key_path, "rb") as f:
                 self.RSA_public_key = serialization.load_pem_public_key(f.read())
+            RSA_Server._key_cache[dir_for_keys] = (self.RSA_private_key, self.RSA_public_key)
             return
-            
+
         self.RSA_private_key = rsa.generate_private_key(
             public_exponent=65537,
             key_size=2048
@@ -377,6 +596,7 @@ class RSA_Server:
                 encoding=serialization.Encoding.PEM,
                 format=serialization.PublicFormat.SubjectPublicKeyInfo
             ))
+        RSA_Server._key_cache[dir_for_keys] = (self.RSA_private_key, self.RSA_public_key)
 
     def get_public_key_RSA(self):
         pem_public = self.RSA_public_key.public_bytes(
@@ -407,6 +627,8 @@ class UDPServer:
 
     def __init__(self, self_ip, self_port, srv_ip, srv_port):
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Same rebind-after-restart treatment as the TCP listener
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.ip = self_ip
         self.port = self_port
         self.srv_ip = srv_ip
@@ -417,12 +639,15 @@ class UDPServer:
     def run(self):
         try:
             self.sock.bind((self.ip, self.port))
+            # One reusable buffer — recvfrom allocated a fresh bytes object
+            # per datagram, probe or not
+            buf = bytearray(1024)
             while True:
-                bin_data, addr = self.sock.recvfrom(1024)
-                if bin_data == b"WHRSV":
-                    self.logger.info(f"Recv From Bnode at {addr[0]}:{addr[1]} <<< WHRSV")
+                n, addr = self.sock.recvfrom_into(buf)
+                if buf[:n] == b"WHRSV":
+                    self.logger.info("Recv From Bnode at %s:%s <<< WHRSV", addr[0], addr[1])
                     self.sock.sendto(self.message_to_send, addr)
-                    self.logger.info(f"Sent to Bnode at {addr[0]}:{addr[1]} >>> {self.message_to_send.decode()}")
+                    self.logger.info("Sent to Bnode at %s:%s >>> %s", addr[0], addr[1], self.message_to_send.decode())
         except OSError as e:
             self.logger.error(f"CONNECTION ERROR! {e}")
         except Exception as e:
@@ -446,9 +671,11 @@ class UDPClient:
         while self.tcp_ip is None:
             self.sock.sendto(b"WHRSV", (self.broadcast_ip, self.udp_srv_port))
             bin_data, addr = self.sock.recvfrom(1024)
-            self.logger.info(f"UDP client received raw info from {addr}")
+            self.logger.info("UDP client received raw info from %s", addr)
             try:
-                _, tcp_ip, tcp_port = bin_data.decode().split('|')
+                # Bounded split on the raw bytes; decode only the IP field
+                _, tcp_ip, tcp_port = bin_data.split(b'|', 2)
+                tcp_ip = tcp_ip.decode()
                 tcp_port = int(tcp_port)
                 self.logger.info(f"Server's At {tcp_ip}:{tcp_port}")
                 self.tcp_port = tcp_port
@@ -491,9 +718,13 @@ def migrate_asset_status(raw: dict) -> str:
     return ASSET_STATUS_UPLOADED
 
 
-@dataclass
+@dataclass(slots=True)
 class MarketplaceItem:
-    """Marketplace asset — shared between server, gateway, and client."""
+    """Marketplace asset — shared between server, gateway, and client.
+
+    slots=True: listing paths build one per asset, so skipping the instance
+    __dict__ keeps bulk loads compact.
+    """
 
     asset_id: str
     owner: str
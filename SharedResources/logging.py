@@ -9,7 +9,10 @@ from __future__ import annotations
 
 __author__ = "Nadav"
 
+import atexit
 import logging
+import logging.handlers
+import queue
 from pathlib import Path
 
 YELLOW  = "\033[33m"
@@ -84,29 +87,55 @@ class ColoredFormatter(logging.Formatter):
         return formatted
 
 
+class _PassthroughQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records untouched — format/colour on the listener thread.
+
+    The stock prepare() merges args and formats on the calling thread (it
+    exists for cross-process pickling); in-process we want the hot path to
+    be just a queue put.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
 class Logger:
     """Project logger: partial yellow for sent/recv, orange WARNING, red ERROR, Flet suppressed."""
 
     configured = False
     level = logging.DEBUG
+    # name → (short file name, stdlib logger).  Communication creates a Logger
+    # per connection, so skip Path() parsing and getLogger's lock on repeats.
+    _resolved: dict[str, tuple[str, logging.Logger]] = {}
 
     def __init__(self, file_name: str):
-        self.file_name = Path(file_name).name
         if not Logger.configured:
             Logger.configure()
-        self.logger = logging.getLogger(self.file_name)
+        cached = Logger._resolved.get(file_name)
+        if cached is None:
+            short = Path(file_name).name
+            cached = (short, logging.getLogger(short))
+            Logger._resolved[file_name] = cached
+        self.file_name, self.logger = cached
 
     @classmethod
     def configure(cls):
-        handler = logging.StreamHandler()
-        handler.setFormatter(ColoredFormatter(
+        stream = logging.StreamHandler()
+        stream.setFormatter(ColoredFormatter(
             fmt="%(asctime)s %(message)s",
             datefmt="%H:%M:%S",
         ))
-        handler.addFilter(NoiseFilter())
+        stream.addFilter(NoiseFilter())
+        # Worker threads only pay a queue put; the listener thread does the
+        # filtering, colouring and stderr write, so N threads never contend
+        # on the stream handler's lock mid-request.
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, stream)
+        listener.start()
+        atexit.register(listener.stop)  # flush queued records on shutdown
         root = logging.getLogger()
         root.handlers.clear()
-        root.addHandler(handler)
+        root.addHandler(_PassthroughQueueHandler(log_queue))
         root.setLevel(cls.level)
         # Belt-and-suspenders: also suppress known Flet loggers directly
         for name in FLET_NOISE_PREFIXES:
@@ -120,14 +149,20 @@ class Logger:
         if cls.configured:
             logging.getLogger().setLevel(level)
 
-    def debug(self, message: str, **kwargs):
-        self.logger.debug(message, **kwargs)
+    def isEnabledFor(self, level: int) -> bool:
+        """Cheap level check so callers can skip building expensive log strings."""
+        return self.logger.isEnabledFor(level)
+
+    # *args pass straight through to stdlib %-formatting, so callers can log
+    # lazily ("got %s", obj) and pay the str() cost only for emitted records.
+    def debug(self, message: str, *args, **kwargs):
+        self.logger.debug(message, *args, **kwargs)
 
-    def info(self, message: str, **kwargs):
-        self.logger.info(message, **kwargs)
+    def info(self, message: str, *args, **kwargs):
+        self.logger.info(message, *args, **kwargs)
 
-    def warning(self, message: str, **kwargs):
-        self.logger.warning(message, **kwargs)
+    def warning(self, message: str, *args, **kwargs):
+        self.logger.warning(message, *args, **kwargs)
 
-    def error(self, message: str, **kwargs):
-        self.logger.error(message, **kwargs)
+    def error(self, message: str, *args, **kwargs):
+        self.logger.error(message, *args, **kwargs)
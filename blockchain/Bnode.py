@@ -110,9 +110,26 @@ class BlockchainNode:
         self.chain = []
         self.balances = {}
         self.pending_txs = []
+        # Incremental chain indexes — mining-retry loops probe these on every
+        # abort, and rescanning the whole chain per probe grows with history.
+        self._tx_id_index = set()
+        self._minted_id_index = set()
 
         self.gateway_client = None
         self.gateway_comm = None
+        self._advertised_ip = ""
+        self._advertised_ip_for = None  # gateway_client the cached IP belongs to
+
+        # Bound once — handle_gateway_message used to rebuild both dispatch
+        # dicts for every incoming gateway message.
+        self._threaded_handlers = {
+            msg_type: getattr(self, name)
+            for msg_type, name in self._THREADED_HANDLER_NAMES.items()
+        }
+        self._inline_handlers = {
+            msg_type: getattr(self, name)
+            for msg_type, name in self._INLINE_HANDLER_NAMES.items()
+        }
 
         self.load_local_state()
 
@@ -122,8 +139,9 @@ class BlockchainNode:
         self.connect_to_gateway()
         threading.Thread(target=self.server_for_peers.start, daemon=True).start()
         self.logger.info(f"[{self.node_id}] listening for peers at {self.ip}:{self.port}")
-        while not self._node_stop_event.is_set():
-            time.sleep(0.2)
+        # Block on the event itself — stop() wakes this immediately, with no
+        # 0.2s polling wakeups while the node idles.
+        self._node_stop_event.wait()
 
     def stop(self):
         self._node_stop_event.set()
@@ -138,12 +156,14 @@ class BlockchainNode:
             sock.settimeout(float(BROADCAST_DISCOVERY_FREQUENCY))
             sock.sendto(b"WHRSV", ("255.255.255.255", int(GATEWAY_UDP_PORT)))
             logger = Logger("Bnode-Discovery")
-            logger.debug(f"[{self.node_id}] sent gateway discovery WHRSV to {"255.255.255.255", int(GATEWAY_UDP_PORT)}")
+            logger.debug(f"[{self.node_id}] sent gateway discovery WHRSV to {('255.255.255.255', int(GATEWAY_UDP_PORT))}")
             raw, _ = sock.recvfrom(1024)
-            parts = raw.decode("utf-8", errors="ignore").split("|")
-            if len(parts) != 3 or parts[0] != "SRVAT":
+            # Split on the raw bytes and only decode the IP field — a junk
+            # datagram is rejected before any str conversion happens
+            parts = raw.split(b"|", 2)
+            if len(parts) != 3 or parts[0] != b"SRVAT":
                 return None
-            return parts[1], int(parts[2])
+            return parts[1].decode("utf-8", errors="ignore"), int(parts[2])
         except Exception:
             return None
         finally:
@@ -244,6 +264,7 @@ class BlockchainNode:
             else:
                 self.chain = clean_chain
                 self.balances = {k: float(v) for k, v in raw_balances.items()} if isinstance(raw_balances, dict) else {}
+            self._reindex_chain()
 
             self.save_json(self.ledger_path, self.chain)
             self.save_json(self.balances_path, self.balances)
@@ -277,14 +298,32 @@ class BlockchainNode:
             return False
         return True
 
+    def _reindex_chain(self):
+        """Rebuild the tx-id / minted-asset indexes from self.chain.
+
+        Call with self.lock held, whenever the chain is replaced wholesale
+        (load, peer sync); add_block maintains the sets incrementally.
+        """
+        tx_ids, minted = set(), set()
+        for b in self.chain:
+            tx = b.get("tx")
+            if not isinstance(tx, dict):
+                continue
+            tx_id = str(tx.get("tx_id", ""))
+            if tx_id:
+                tx_ids.add(tx_id)
+            if str(tx.get("type", "")).upper() == "ASSET_MINT":
+                asset_id = str(tx.get("asset_id", ""))
+                if asset_id:
+                    minted.add(asset_id)
+        self._tx_id_index = tx_ids
+        self._minted_id_index = minted
+
     def _is_tx_in_chain(self, tx_id: str) -> bool:
         if not tx_id:
             return False
         with self.lock:
-            return any(
-                isinstance(b.get("tx"), dict) and str(b["tx"].get("tx_id", "")) == tx_id
-                for b in self.chain
-            )
+            return tx_id in self._tx_id_index
 
     def mine(self, transaction):
         if not self.validate_tx(transaction):
@@ -376,6 +415,13 @@ class BlockchainNode:
                     self.balances[seller_pk] = round(float(self.balances.get(seller_pk, 0.0)) + price, 8)
 
             self.chain.append(block)
+            tx_id = str(tx.get("tx_id", ""))
+            if tx_id:
+                self._tx_id_index.add(tx_id)
+            if tx_type == "ASSET_MINT":
+                minted_id = str(tx.get("asset_id", ""))
+                if minted_id:
+                    self._minted_id_index.add(minted_id)
             self.pending_txs = []
             self.persist_local_state()
 
@@ -390,10 +436,18 @@ class BlockchainNode:
             self.logger.warning(f"[{self.node_id}] gateway send failed: {exc}")
 
     def advertised_ip(self) -> str:
+        # The local address of the gateway connection can't change while the
+        # connection lives, so resolve it once per connection instead of
+        # calling getsockname for every outgoing message.
+        client = self.gateway_client
+        if client is not None and self._advertised_ip_for is client:
+            return self._advertised_ip
         try:
-            if self.gateway_client and self.gateway_client.sock:
-                local_ip = str(self.gateway_client.sock.getsockname()[0])
+            if client and client.sock:
+                local_ip = str(client.sock.getsockname()[0])
                 if local_ip and local_ip != "0.0.0.0":
+                    self._advertised_ip = local_ip
+                    self._advertised_ip_for = client
                     return local_ip
         except Exception:
             pass
@@ -443,32 +497,34 @@ class BlockchainNode:
             "sender_port": self.port,
         })
 
+    # Mining is blocking, so these always run in their own thread
+    _THREADED_HANDLER_NAMES = {
+        "UPLOAD_ASSET":   "handle_mint_request",
+        "START_MINING":   "handle_mint_request",
+        "UNLIST_ASSET":   "handle_unlist_request",
+        "LIST_ASSET":     "handle_list_request",
+        "TX_REQUEST_BUY": "handle_tx_request_buy",
+    }
+
+    _INLINE_HANDLER_NAMES = {
+        "TX_REQUEST_SELL":        "handle_tx_request_sell",
+        "BROADCAST_TX_TO_VERIFY": "handle_broadcast_tx_to_verify",
+        "CREATE_BALANCE":         "handle_create_balance",
+        "GET_LEDGER":             "handle_get_ledger_sync",
+        "GET_MINTED_IDS":         "handle_get_minted_ids",
+    }
+
     def handle_gateway_message(self, msg):
         msg_type = str(msg.get("type", "")).strip().upper()
 
-        # Mining is blocking, so it always runs in its own thread
-        threaded_handlers = {
-            "UPLOAD_ASSET":   self.handle_mint_request,
-            "START_MINING":   self.handle_mint_request,
-            "UNLIST_ASSET":   self.handle_unlist_request,
-            "LIST_ASSET":     self.handle_list_request,
-            "TX_REQUEST_BUY": self.handle_tx_request_buy,
-        }
-
-        inline_handlers = {
-            "TX_REQUEST_SELL":        self.handle_tx_request_sell,
-            "BROADCAST_TX_TO_VERIFY": self.handle_broadcast_tx_to_verify,
-            "CREATE_BALANCE":         self.handle_create_balance,
-            "GET_LEDGER":             self.handle_get_ledger_sync,
-            "GET_MINTED_IDS":         self.handle_get_minted_ids,
-        }
-
-        if msg_type in threaded_handlers:
-            threading.Thread(target=threaded_handlers[msg_type], args=(msg,), daemon=True).start()
+        threaded = self._threaded_handlers.get(msg_type)
+        if threaded is not None:
+            threading.Thread(target=threaded, args=(msg,), daemon=True).start()
             return
 
-        if msg_type in inline_handlers:
-            inline_handlers[msg_type](msg)
+        inline = self._inline_handlers.get(msg_type)
+        if inline is not None:
+            inline(msg)
             return
 
         # GET_BALANCE has two paths: peer-sync request (has publisher_ip) vs direct query
@@ -518,12 +574,7 @@ class BlockchainNode:
 
     def _guard_already_minted_bool(self, asset_id: str) -> bool:
         with self.lock:
-            return any(
-                isinstance(b.get("tx"), dict)
-                and str(b["tx"].get("type", "")).upper() == "ASSET_MINT"
-                and str(b["tx"].get("asset_id", "")) == asset_id
-                for b in self.chain
-            )
+            return asset_id in self._minted_id_index
 
     def _mine_or_raise(self, tx) -> dict:
         block = self.mine(tx)
@@ -770,16 +821,21 @@ class BlockchainNode:
         block = data.get("block") or {}
         block_index = int(block.get("index", -1)) if block else -1
         my_len = len(self.chain)
-        self.logger.info(f"[{self.node_id}] BROADCAST: verifying block index={block_index} from {peer_label} (their chain={publisher_chain_length}, ours={my_len})")
+        # Lazy %-args: one of these fires per broadcast, which arrives for
+        # every block any peer mines
+        self.logger.info("[%s] BROADCAST: verifying block index=%s from %s (their chain=%s, ours=%s)",
+                         self.node_id, block_index, peer_label, publisher_chain_length, my_len)
         if publisher_chain_length > my_len + 1:
-            self.logger.warning(f"[{self.node_id}] BROADCAST: chain gap — {peer_label} is at len={publisher_chain_length}, we are at {my_len}; stopping mine to sync")
+            self.logger.warning("[%s] BROADCAST: chain gap — %s is at len=%s, we are at %s; stopping mine to sync",
+                                self.node_id, peer_label, publisher_chain_length, my_len)
             self._mining_stop_peer = peer_label
             self._mining_stop_event.set()
             self.ensure_local_state_or_fetch(sender_ip, sender_port, publisher_chain_length, data.get("userpk", ""))
             return
         if block and block_index > my_len:
             effective_len = publisher_chain_length if publisher_chain_length > 0 else block_index + 1
-            self.logger.warning(f"[{self.node_id}] BROADCAST: block index={block_index} is ahead of our chain len={my_len} — stopping mine to sync with {peer_label}")
+            self.logger.warning("[%s] BROADCAST: block index=%s is ahead of our chain len=%s — stopping mine to sync with %s",
+                                self.node_id, block_index, my_len, peer_label)
             self._mining_stop_peer = peer_label
             self._mining_stop_event.set()
             self.ensure_local_state_or_fetch(sender_ip, sender_port, effective_len, data.get("userpk", ""))
@@ -795,16 +851,19 @@ class BlockchainNode:
                     self._mining_stop_event.set()
                     self.ensure_local_state_or_fetch(sender_ip, sender_port, publisher_chain_length, data.get("userpk", ""), force=True)
                     return
-            self.logger.info(f"[{self.node_id}] BROADCAST: verification complete — accepted block index={block_index} from {peer_label}, abandoning mine")
+            self.logger.info("[%s] BROADCAST: verification complete — accepted block index=%s from %s, abandoning mine",
+                             self.node_id, block_index, peer_label)
             self._mining_stop_peer = peer_label
             self._mining_stop_event.set()
             self.add_block(block)
             self.register_blockchain_node()
         else:
             if block:
-                self.logger.warning(f"[{self.node_id}] BROADCAST: verification failed — block index={block_index} doesn't fit our chain len={my_len} (stale/diverged block from {peer_label})")
+                self.logger.warning("[%s] BROADCAST: verification failed — block index=%s doesn't fit our chain len=%s (stale/diverged block from %s)",
+                                    self.node_id, block_index, my_len, peer_label)
             else:
-                self.logger.warning(f"[{self.node_id}] BROADCAST: verification failed — no block in message from {peer_label}")
+                self.logger.warning("[%s] BROADCAST: verification failed — no block in message from %s",
+                                    self.node_id, peer_label)
 
     # -------- peer ledger sharing --------
 
@@ -830,18 +889,12 @@ class BlockchainNode:
         """Respond with all ASSET_MINT asset_ids from our chain."""
         _ = msg
         with self.lock:
-            minted = [
-                str(b["tx"].get("asset_id", ""))
-                for b in self.chain
-                if isinstance(b.get("tx"), dict)
-                and str(b["tx"].get("type", "")).upper() == "ASSET_MINT"
-            ]
-        minted = [a for a in minted if a]
+            minted = list(self._minted_id_index)
         self.send_gateway({
             "type": "MINTED_IDS",
             "data": {"asset_ids": minted},
         })
-        self.logger.debug(f"[{self.node_id}] GET_MINTED_IDS: sent {len(minted)} minted id(s) to gateway")
+        self.logger.debug("[%s] GET_MINTED_IDS: sent %d minted id(s) to gateway", self.node_id, len(minted))
 
     def handle_get_balance_sync(self, msg):
         publisher_ip = msg.get("publisher_ip", "")
@@ -873,15 +926,19 @@ class BlockchainNode:
             "publisher": {"ip": self.ip, "port": self.port, "node_id": self.node_id},
         }
         raw = json.dumps(snapshot, ensure_ascii=False).encode("utf-8")
-        chunks = [raw[i : i + self.CHUNK_SIZE] for i in range(0, len(raw), self.CHUNK_SIZE)]
+        # memoryview slices avoid copying every chunk out of the snapshot —
+        # b64encode reads straight from the original buffer
+        view = memoryview(raw)
+        total_chunks = (len(raw) + self.CHUNK_SIZE - 1) // self.CHUNK_SIZE
 
         comm.send_one_message({
             "type": "LEDGER_SNAPSHOT_START",
-            "chunks": len(chunks),
+            "chunks": total_chunks,
             "total_bytes": len(raw),
         })
 
-        for idx, chunk in enumerate(chunks):
+        for idx in range(total_chunks):
+            chunk = view[idx * self.CHUNK_SIZE : (idx + 1) * self.CHUNK_SIZE]
             comm.send_one_message({
                 "type": "LEDGER_SNAPSHOT_CHUNK",
                 "index": idx,
@@ -925,6 +982,7 @@ class BlockchainNode:
             with self.lock:
                 self.chain = ledger
                 self.balances = {k: float(v) for k, v in balances.items()}
+                self._reindex_chain()
                 self.persist_local_state()
 
             self.logger.info(f"[{self.node_id}] ledger synced from {peer_ip}:{peer_port}")
@@ -984,9 +1042,10 @@ if __name__ == "__main__":
     from SharedResources.logging import Logger
     Logger.set_level(args.debug_level)
 
+    _logger = Logger(__file__)
     if args.port == 0:
-        print("[*] No --port provided. OS will assign a free port.")
+        _logger.info("[*] No --port provided. OS will assign a free port.")
     node = BlockchainNode(ip=args.ip, port=args.port, difficulty=args.difficulty)
-    print(f"[*] Node initialized at {node.ip}:{node.port}")
-    print(f"[*] Node keys directory: {node.node_keys_dir}")
+    _logger.info(f"[*] Node initialized at {node.ip}:{node.port}")
+    _logger.info(f"[*] Node keys directory: {node.node_keys_dir}")
     node.start()